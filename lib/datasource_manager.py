@@ -8,33 +8,163 @@ to distribute load and avoid hitting rate limits on individual APIs.
 import os
 import time
 import random
+import threading
+from collections import OrderedDict
+from urllib.parse import quote, urlencode
+
+import gevent
+import orjson
 import requests
-from typing import Dict, Optional
-from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
 from enum import Enum
 
+REQUEST_TIMEOUT = 10
+REQUEST_HEADERS = {'User-Agent': 'wttr.in/1.0'}
+
+CACHE_TTL = 600  # weather data is stable at ~10 minute granularity
+CACHE_SIZE = 4096
+VALIDATOR_CACHE_SIZE = 256
+
+HEDGE_SOURCES = 2  # sources queried in parallel for one request
+
+COMPASS_16 = (
+    "N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+    "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW",
+)
+
+# OpenWeatherMap weather code -> WWO weather code,
+# based on OpenWeatherMap API documentation
+OWM_TO_WWO = {
+    200: 200,  # Thunderstorm with light rain
+    201: 386,  # Thunderstorm with rain
+    202: 389,  # Thunderstorm with heavy rain
+    210: 200,  # Light thunderstorm
+    211: 389,  # Thunderstorm
+    212: 389,  # Heavy thunderstorm
+    221: 389,  # Ragged thunderstorm
+    230: 200,  # Thunderstorm with light drizzle
+    231: 386,  # Thunderstorm with drizzle
+    232: 389,  # Thunderstorm with heavy drizzle
+    300: 266,  # Light intensity drizzle
+    301: 266,  # Drizzle
+    302: 302,  # Heavy intensity drizzle
+    310: 266,  # Light intensity drizzle rain
+    311: 293,  # Drizzle rain
+    312: 302,  # Heavy intensity drizzle rain
+    313: 305,  # Shower rain and drizzle
+    314: 302,  # Heavy shower rain and drizzle
+    321: 299,  # Shower drizzle
+    500: 176,  # Light rain
+    501: 293,  # Moderate rain
+    502: 302,  # Heavy intensity rain
+    503: 308,  # Very heavy rain
+    504: 308,  # Extreme rain
+    511: 284,  # Freezing rain
+    520: 299,  # Light intensity shower rain
+    521: 305,  # Shower rain
+    522: 302,  # Heavy intensity shower rain
+    531: 305,  # Ragged shower rain
+    600: 320,  # Light snow
+    601: 332,  # Snow
+    602: 230,  # Heavy snow
+    611: 281,  # Sleet
+    612: 284,  # Light shower sleet
+    613: 284,  # Shower sleet
+    615: 317,  # Light rain and snow
+    616: 317,  # Rain and snow
+    620: 368,  # Light shower snow
+    621: 371,  # Shower snow
+    622: 230,  # Heavy shower snow
+    701: 143,  # Mist
+    711: 143,  # Smoke
+    721: 143,  # Haze
+    731: 143,  # Dust
+    741: 143,  # Fog
+    751: 143,  # Sand
+    761: 143,  # Dust
+    762: 143,  # Volcanic ash
+    771: 143,  # Squalls
+    781: 143,  # Tornado
+    800: 113,  # Clear sky
+    801: 116,  # Few clouds
+    802: 119,  # Scattered clouds
+    803: 119,  # Broken clouds
+    804: 122,  # Overcast clouds
+}
+
+def _c_to_f(temp_c: float) -> int:
+    """Convert a Celsius temperature to rounded Fahrenheit."""
+    if type(temp_c) is int:
+        # (9c + 160) / 5 never ends in .5, so adding 2 before // rounds exactly
+        return (temp_c * 9 + 162) // 5
+    return round(temp_c * 9/5 + 32)
+
+def _kmph_to_mph(speed_kmph: float) -> int:
+    """Convert a km/h speed to rounded mph."""
+    if type(speed_kmph) is int:
+        return (speed_kmph * 621371 + 500000) // 1000000
+    return round(speed_kmph * 0.621371)
+
 class DataSourceType(Enum):
     METNO = "metno"
     OPENWEATHERMAP = "openweathermap"
     WEATHERAPI = "weatherapi"
     ACCUWEATHER = "accuweather"
 
-@dataclass
+@dataclass(slots=True)
 class DataSource:
     name: str
     type: DataSourceType
     base_url: str
     api_key: Optional[str] = None
     rate_limit: int = 1000  # requests per hour
-    current_usage: int = 0
-    last_reset: float = 0
+    burst: Optional[int] = None  # token bucket capacity, defaults to a minute's worth
+    tokens: Optional[float] = None  # token bucket level, starts full
+    last_refill: float = field(default_factory=time.monotonic)
     enabled: bool = True
+    disabled_until: float = 0.0  # monotonic deadline of a temporary disable
+
+    def __post_init__(self):
+        if self.burst is None:
+            self.burst = max(1, self.rate_limit // 60)
+        if self.tokens is None:
+            self.tokens = float(self.burst)
 
 class DataSourceManager:
     def __init__(self):
         self.sources: Dict[str, DataSource] = {}
+        self._session = self._create_session()
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._validators: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._usage_lock = threading.Lock()
+        self._dispatch = {
+            DataSourceType.METNO: self._fetch_metno,
+            DataSourceType.OPENWEATHERMAP: self._fetch_openweathermap,
+            DataSourceType.WEATHERAPI: self._fetch_weatherapi,
+            DataSourceType.ACCUWEATHER: self._fetch_accuweather,
+        }
         self._load_sources()
-        self._start_usage_reset_timer()
+
+    def _create_session(self) -> requests.Session:
+        """Create a pooled HTTP session shared by all data sources."""
+        session = requests.Session()
+        session.headers.update(REQUEST_HEADERS)
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=64,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+                respect_retry_after_header=False,  # keep fetches bounded by the timeout
+            ),
+        )
+        session.mount("https://", adapter)
+        return session
 
     def _load_sources(self):
         """Load available data sources from configuration."""
@@ -79,61 +209,117 @@ class DataSourceManager:
                 rate_limit=50  # Free tier: 50 calls/day
             )
 
-    def _start_usage_reset_timer(self):
-        """Reset usage counters hourly."""
-        def reset_usage():
-            current_time = time.time()
+    def _refill(self, source: DataSource, now: float):
+        """Add the tokens `source` earned since its last refill."""
+        elapsed = now - source.last_refill
+        source.tokens = min(source.burst, source.tokens + elapsed * source.rate_limit / 3600)
+        source.last_refill = now
+
+    def _take_token(self, source: DataSource) -> bool:
+        """Consume one request token of `source`; False if the bucket is empty.
+
+        Must be called with `_usage_lock` held, after `_refill`.
+        """
+        if source.tokens >= 1:
+            source.tokens -= 1
+            return True
+        return False
+
+    def get_available_sources(self, count: int) -> List[DataSource]:
+        """Get up to `count` distinct sources with a free token, taking one token from each."""
+        with self._usage_lock:
+            now = time.monotonic()
+            available_sources = []
             for source in self.sources.values():
-                if current_time - source.last_reset >= 3600:  # 1 hour
-                    source.current_usage = 0
-                    source.last_reset = current_time
-            # Schedule next reset
-            time.sleep(3600)
-            reset_usage()
-
-        import threading
-        timer = threading.Thread(target=reset_usage, daemon=True)
-        timer.start()
-
-    def get_available_source(self) -> Optional[DataSource]:
-        """Get an available data source that hasn't exceeded its rate limit."""
-        available_sources = [
-            source for source in self.sources.values()
-            if source.enabled and source.current_usage < source.rate_limit
-        ]
-
-        if not available_sources:
-            return None
-
-        # Random selection to distribute load
-        return random.choice(available_sources)
-
-    def mark_source_used(self, source_name: str):
-        """Increment usage counter for a source."""
-        if source_name in self.sources:
-            self.sources[source_name].current_usage += 1
+                if not source.enabled or source.disabled_until > now:
+                    continue
+                self._refill(source, now)
+                if source.tokens >= 1:
+                    available_sources.append(source)
+
+            selected = []
+            while available_sources and len(selected) < count:
+                if selected:
+                    # Hedge only onto sources that keep a token for the next request
+                    available_sources = [source for source in available_sources if source.tokens >= 2]
+                    if not available_sources:
+                        break
+                # Weight by remaining quota so small-quota sources are not drained first
+                weights = [source.tokens for source in available_sources]
+                source = random.choices(available_sources, weights=weights, k=1)[0]
+                available_sources.remove(source)
+                if self._take_token(source):
+                    selected.append(source)
+            return selected
 
     def disable_source(self, source_name: str):
         """Temporarily disable a source (e.g., if it's returning errors)."""
         if source_name in self.sources:
-            self.sources[source_name].enabled = False
             # Re-enable after 5 minutes
-            def reenable():
-                time.sleep(300)
-                self.sources[source_name].enabled = True
-            import threading
-            threading.Thread(target=reenable, daemon=True).start()
+            self.sources[source_name].disabled_until = time.monotonic() + 300
+
+    def _cache_get(self, key: tuple) -> Optional[Dict]:
+        """Return cached data for `key` if it is younger than CACHE_TTL."""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            timestamp, data = entry
+            if time.monotonic() - timestamp >= CACHE_TTL:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return data
+
+    def _cache_put(self, key: tuple, data: Dict):
+        """Store `data` under `key`, evicting the least recently used entry."""
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), data)
+            self._cache.move_to_end(key)
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
 
     def fetch_weather_data(self, location: str, days: int = 3) -> Optional[Dict]:
-        """Fetch weather data from available sources."""
-        source = self.get_available_source()
-        if not source:
+        """Fetch weather data from cache or from available sources."""
+        key = (location, days)
+        data = self._cache_get(key)
+        if data is not None:
+            return data
+
+        try:
+            lat, lon = location.split(',', 1)
+        except ValueError:
+            return None
+
+        sources = self.get_available_sources(HEDGE_SOURCES)
+        if not sources:
             return None
 
+        # Hedged request: query several sources at once, keep the first
+        # usable answer and cancel the rest.
+        pending = [
+            gevent.spawn(self._fetch_or_disable, source, lat, lon, days)
+            for source in sources
+        ]
+        data = None
+        while pending and not data:
+            for greenlet in gevent.wait(pending, count=1):
+                pending.remove(greenlet)
+                if greenlet.value:
+                    data = greenlet.value
+                    break
+        gevent.killall(pending, block=False)
+
+        if data:
+            self._cache_put(key, data)
+            return data
+        return None
+
+    def _fetch_or_disable(self, source: DataSource, lat: str, lon: str, days: int) -> Optional[Dict]:
+        """Fetch from `source`, disabling it if it fails or returns nothing."""
         try:
-            data = self._fetch_from_source(source, location, days)
+            data = self._fetch_from_source(source, lat, lon, days)
             if data:
-                self.mark_source_used(source.name)
                 return data
             else:
                 self.disable_source(source.name)
@@ -143,92 +329,133 @@ class DataSourceManager:
             self.disable_source(source.name)
             return None
 
-    def _fetch_from_source(self, source: DataSource, location: str, days: int) -> Optional[Dict]:
+    def _fetch_from_source(self, source: DataSource, lat: str, lon: str, days: int) -> Optional[Dict]:
         """Fetch data from a specific source."""
-        if source.type == DataSourceType.METNO:
-            return self._fetch_metno(location, days)
-        elif source.type == DataSourceType.OPENWEATHERMAP:
-            return self._fetch_openweathermap(location, days)
-        elif source.type == DataSourceType.WEATHERAPI:
-            return self._fetch_weatherapi(location, days)
-        elif source.type == DataSourceType.ACCUWEATHER:
-            return self._fetch_accuweather(location, days)
-        return None
+        fetch = self._dispatch.get(source.type)
+        if fetch is None:
+            return None
+        return fetch(source, lat, lon, days)
+
+    def _get_json(self, url: str) -> Optional[Dict]:
+        """Fetch `url` (conditionally, if validators are cached) and return decoded JSON or None."""
+        with self._cache_lock:
+            validator = self._validators.get(url)
+
+        headers = {}
+        if validator is not None:
+            etag, last_modified, _ = validator
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = self._session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304 and validator is not None:
+            return validator[2]
+        if response.status_code != 200:
+            return None
 
-    def _fetch_metno(self, location: str, days: int) -> Optional[Dict]:
+        data = orjson.loads(response.content)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self._cache_lock:
+                self._validators[url] = (etag, last_modified, data)
+                self._validators.move_to_end(url)
+                if len(self._validators) > VALIDATOR_CACHE_SIZE:
+                    self._validators.popitem(last=False)
+        return data
+
+    def _fetch_metno(self, source: DataSource, lat: str, lon: str, days: int) -> Optional[Dict]:
         """Fetch from MET Norway API."""
         # Implementation similar to existing metno.py
-        url = f"https://api.met.no/weatherapi/locationforecast/2.0/complete?lat={location.split(',')[0]}&lon={location.split(',')[1]}"
-        headers = {'User-Agent': 'wttr.in/1.0'}
-        response = requests.get(url, headers=headers, timeout=10)
+        query = urlencode({'lat': lat, 'lon': lon})
+        url = f"{source.base_url}/weatherapi/locationforecast/2.0/complete?{query}"
+        data = self._get_json(url)
 
-        if response.status_code == 200:
-            return self._convert_metno_to_standard(response.json(), days)
+        if data is not None:
+            return self._convert_metno_to_standard(data, days)
         return None
 
-    def _fetch_openweathermap(self, location: str, days: int) -> Optional[Dict]:
+    def _fetch_openweathermap(self, source: DataSource, lat: str, lon: str, days: int) -> Optional[Dict]:
         """Fetch from OpenWeatherMap API."""
-        if not self.sources["openweathermap"].api_key:
+        api_key = source.api_key
+        if not api_key:
             return None
 
-        # Parse location (lat,lng)
-        lat, lng = location.split(',')
-        url = f"{self.sources['openweathermap'].base_url}/onecall?lat={lat}&lon={lng}&exclude=minutely&appid={self.sources['openweathermap'].api_key}"
-        response = requests.get(url, timeout=10)
+        query = urlencode({'lat': lat, 'lon': lon, 'exclude': 'minutely', 'appid': api_key})
+        url = f"{source.base_url}/onecall?{query}"
+        data = self._get_json(url)
 
-        if response.status_code == 200:
-            return self._convert_openweather_to_standard(response.json(), days)
+        if data is not None:
+            return self._convert_openweather_to_standard(data, days)
         return None
 
-    def _fetch_weatherapi(self, location: str, days: int) -> Optional[Dict]:
+    def _fetch_weatherapi(self, source: DataSource, lat: str, lon: str, days: int) -> Optional[Dict]:
         """Fetch from WeatherAPI."""
-        if not self.sources["weatherapi"].api_key:
+        api_key = source.api_key
+        if not api_key:
             return None
 
-        url = f"{self.sources['weatherapi'].base_url}/forecast.json?q={location}&days={days}&key={self.sources['weatherapi'].api_key}"
-        response = requests.get(url, timeout=10)
+        query = urlencode({'q': f"{lat},{lon}", 'days': days, 'key': api_key})
+        url = f"{source.base_url}/forecast.json?{query}"
+        data = self._get_json(url)
 
-        if response.status_code == 200:
-            return self._convert_weatherapi_to_standard(response.json(), days)
+        if data is not None:
+            return self._convert_weatherapi_to_standard(data, days)
         return None
 
-    def _fetch_accuweather(self, location: str, days: int) -> Optional[Dict]:
+    def _fetch_accuweather(self, source: DataSource, lat: str, lon: str, days: int) -> Optional[Dict]:
         """Fetch from AccuWeather API."""
-        if not self.sources["accuweather"].api_key:
+        api_key = source.api_key
+        if not api_key:
             return None
+        base_url = source.base_url
 
         # First get location key
-        search_url = f"{self.sources['accuweather'].base_url}/locations/v1/cities/geoposition/search?q={location}&apikey={self.sources['accuweather'].api_key}"
-        search_response = requests.get(search_url, timeout=10)
+        query = urlencode({'q': f"{lat},{lon}", 'apikey': api_key})
+        search_url = f"{base_url}/locations/v1/cities/geoposition/search?{query}"
+        search_data = self._get_json(search_url)
 
-        if search_response.status_code != 200:
+        if search_data is None:
             return None
 
-        location_key = search_response.json()['Key']
+        location_key = search_data['Key']
 
         # Then get forecast
-        forecast_url = f"{self.sources['accuweather'].base_url}/forecasts/v1/daily/5day/{location_key}?apikey={self.sources['accuweather'].api_key}"
-        forecast_response = requests.get(forecast_url, timeout=10)
+        query = urlencode({'apikey': api_key})
+        forecast_url = f"{base_url}/forecasts/v1/daily/5day/{quote(str(location_key), safe='')}?{query}"
+        forecast_data = self._get_json(forecast_url)
 
-        if forecast_response.status_code == 200:
-            return self._convert_accuweather_to_standard(forecast_response.json(), days)
+        if forecast_data is not None:
+            return self._convert_accuweather_to_standard(forecast_data, days)
         return None
 
-    def _convert_metno_to_standard(self, data: Dict, days: int) -> Dict:
-        """Convert MET Norway response to wttr.in standard format."""
-        # Simplified conversion - would need full implementation
+    def _envelope(self, lat, lon, current: Dict, weather: List[Dict]) -> Dict:
+        """Wrap converted conditions into the wttr.in standard response."""
         return {
             "data": {
-                "current_condition": [{
-                    "temp_C": str(data.get('properties', {}).get('timeseries', [{}])[0].get('data', {}).get('instant', {}).get('details', {}).get('air_temperature', 0)),
-                    "weatherDesc": [{"value": "Clear"}],
-                    "humidity": "50",
-                    "windspeedKmph": "10"
+                "request": [{
+                    "type": "feature",
+                    "query": f"{lat},{lon}"
                 }],
-                "weather": []
+                "current_condition": [current],
+                "weather": weather
             }
         }
 
+    def _convert_metno_to_standard(self, data: Dict, days: int) -> Dict:
+        """Convert MET Norway response to wttr.in standard format."""
+        # Simplified conversion - would need full implementation
+        lon, lat = data.get('geometry', {}).get('coordinates', [0, 0])[:2]
+        current_condition = {
+            "temp_C": str(data.get('properties', {}).get('timeseries', [{}])[0].get('data', {}).get('instant', {}).get('details', {}).get('air_temperature', 0)),
+            "weatherDesc": [{"value": "Clear"}],
+            "humidity": "50",
+            "windspeedKmph": "10"
+        }
+        return self._envelope(lat, lon, current_condition, [])
+
     def _convert_openweather_to_standard(self, data: Dict, days: int) -> Optional[Dict]:
         """Convert OpenWeatherMap response to wttr.in standard format."""
         if not data or 'current' not in data:
@@ -247,16 +474,7 @@ class DataSourceManager:
             for day_data in data['daily'][:days]:
                 weather.append(self._convert_openweather_daily(day_data))
 
-        return {
-            "data": {
-                "request": [{
-                    "type": "feature",
-                    "query": f"{lat},{lon}"
-                }],
-                "current_condition": [current_condition],
-                "weather": weather
-            }
-        }
+        return self._envelope(lat, lon, current_condition, weather)
 
     def _convert_openweather_hourly(self, hour_data: Dict) -> Dict:
         """Convert OpenWeatherMap hourly data to wttr.in format."""
@@ -264,43 +482,47 @@ class DataSourceManager:
         if isinstance(temp_c, dict):  # Daily data has temp as dict
             temp_c = temp_c.get('day', 0)
 
-        weather_id = hour_data.get('weather', [{}])[0].get('id', 800)
-        weather_code = self._openweather_to_wwo_code(weather_id)
-        weather_desc = hour_data.get('weather', [{}])[0].get('description', 'Clear')
+        weather = hour_data.get('weather', [{}])[0]
+        weather_code = self._openweather_to_wwo_code(weather.get('id', 800))
+        weather_desc = weather.get('description', 'Clear')
+        wind_deg = hour_data.get('wind_deg', 0)
 
         wind_speed_mps = hour_data.get('wind_speed', 0)
         wind_speed_kmph = wind_speed_mps * 3.6  # Convert m/s to km/h
 
         return {
-            "temp_C": str(int(round(temp_c, 0))),
-            "temp_F": str(int(round(temp_c * 9/5 + 32, 0))),
+            "temp_C": str(round(temp_c)),
+            "temp_F": str(_c_to_f(temp_c)),
             "weatherCode": str(weather_code),
             "weatherDesc": [{"value": weather_desc.capitalize()}],
-            "windspeedKmph": str(int(round(wind_speed_kmph, 0))),
-            "windspeedMiles": str(int(round(wind_speed_kmph * 0.621371, 0))),
-            "winddirDegree": str(hour_data.get('wind_deg', 0)),
-            "winddir16Point": self._degrees_to_16_point(hour_data.get('wind_deg', 0)),
-            "precipMM": str(hour_data.get('rain', {}).get('1h', 0) if 'rain' in hour_data else 0),
+            "windspeedKmph": str(round(wind_speed_kmph)),
+            "windspeedMiles": str(_kmph_to_mph(wind_speed_kmph)),
+            "winddirDegree": str(wind_deg),
+            "winddir16Point": self._degrees_to_16_point(wind_deg),
+            "precipMM": str(hour_data.get('rain', {}).get('1h', 0)),
             "humidity": str(hour_data.get('humidity', 0)),
             "pressure": str(hour_data.get('pressure', 0)),
-            "visibility": str(hour_data.get('visibility', 0) if 'visibility' in hour_data else 10000),
+            "visibility": str(hour_data.get('visibility', 10000)),
             "cloudcover": str(hour_data.get('clouds', 0)),
-            "FeelsLikeC": str(int(round(hour_data.get('feels_like', temp_c), 0))),
+            "FeelsLikeC": str(round(hour_data.get('feels_like', temp_c))),
             "uvIndex": str(int(hour_data.get('uvi', 0))),
         }
 
     def _convert_openweather_daily(self, day_data: Dict) -> Dict:
         """Convert OpenWeatherMap daily data to wttr.in format."""
         temp = day_data.get('temp', {})
+        max_temp = temp.get('max', 0)
+        min_temp = temp.get('min', 0)
+        avg_temp = temp.get('day', 0)
 
         return {
             "date": day_data.get('dt', 0),  # Unix timestamp
-            "maxtempC": str(int(round(temp.get('max', 0), 0))),
-            "maxtempF": str(int(round(temp.get('max', 0) * 9/5 + 32, 0))),
-            "mintempC": str(int(round(temp.get('min', 0), 0))),
-            "mintempF": str(int(round(temp.get('min', 0) * 9/5 + 32, 0))),
-            "avgtempC": str(int(round(temp.get('day', 0), 0))),
-            "avgtempF": str(int(round(temp.get('day', 0) * 9/5 + 32, 0))),
+            "maxtempC": str(round(max_temp)),
+            "maxtempF": str(_c_to_f(max_temp)),
+            "mintempC": str(round(min_temp)),
+            "mintempF": str(_c_to_f(min_temp)),
+            "avgtempC": str(round(avg_temp)),
+            "avgtempF": str(_c_to_f(avg_temp)),
             "totalSnow_cm": str(day_data.get('snow', 0)),
             "sunHour": "12",  # Not provided by OpenWeather, default
             "uvIndex": str(int(day_data.get('uvi', 0))),
@@ -309,74 +531,11 @@ class DataSourceManager:
 
     def _openweather_to_wwo_code(self, owm_code: int) -> int:
         """Convert OpenWeatherMap weather codes to WWO codes."""
-        # Mapping based on OpenWeatherMap API documentation
-        mapping = {
-            200: 200,  # Thunderstorm with light rain
-            201: 386,  # Thunderstorm with rain
-            202: 389,  # Thunderstorm with heavy rain
-            210: 200,  # Light thunderstorm
-            211: 389,  # Thunderstorm
-            212: 389,  # Heavy thunderstorm
-            221: 389,  # Ragged thunderstorm
-            230: 200,  # Thunderstorm with light drizzle
-            231: 386,  # Thunderstorm with drizzle
-            232: 389,  # Thunderstorm with heavy drizzle
-            300: 266,  # Light intensity drizzle
-            301: 266,  # Drizzle
-            302: 302,  # Heavy intensity drizzle
-            310: 266,  # Light intensity drizzle rain
-            311: 293,  # Drizzle rain
-            312: 302,  # Heavy intensity drizzle rain
-            313: 305,  # Shower rain and drizzle
-            314: 302,  # Heavy shower rain and drizzle
-            321: 299,  # Shower drizzle
-            500: 176,  # Light rain
-            501: 293,  # Moderate rain
-            502: 302,  # Heavy intensity rain
-            503: 308,  # Very heavy rain
-            504: 308,  # Extreme rain
-            511: 284,  # Freezing rain
-            520: 299,  # Light intensity shower rain
-            521: 305,  # Shower rain
-            522: 302,  # Heavy intensity shower rain
-            531: 305,  # Ragged shower rain
-            600: 320,  # Light snow
-            601: 332,  # Snow
-            602: 230,  # Heavy snow
-            611: 281,  # Sleet
-            612: 284,  # Light shower sleet
-            613: 284,  # Shower sleet
-            615: 317,  # Light rain and snow
-            616: 317,  # Rain and snow
-            620: 368,  # Light shower snow
-            621: 371,  # Shower snow
-            622: 230,  # Heavy shower snow
-            701: 143,  # Mist
-            711: 143,  # Smoke
-            721: 143,  # Haze
-            731: 143,  # Dust
-            741: 143,  # Fog
-            751: 143,  # Sand
-            761: 143,  # Dust
-            762: 143,  # Volcanic ash
-            771: 143,  # Squalls
-            781: 143,  # Tornado
-            800: 113,  # Clear sky
-            801: 116,  # Few clouds
-            802: 119,  # Scattered clouds
-            803: 119,  # Broken clouds
-            804: 122,  # Overcast clouds
-        }
-        return mapping.get(owm_code, 113)  # Default to clear sky
+        return OWM_TO_WWO.get(owm_code, 113)  # Default to clear sky
 
     def _degrees_to_16_point(self, degrees: float) -> str:
         """Convert wind direction in degrees to 16-point compass."""
-        directions = [
-            "N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
-            "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"
-        ]
-        index = round(degrees / 22.5) % 16
-        return directions[index]
+        return COMPASS_16[int((degrees + 11.25) // 22.5) % 16]
         
     def _convert_weatherapi_to_standard(self, data: Dict, days: int) -> Optional[Dict]:
         """Convert WeatherAPI response to wttr.in standard format."""
@@ -395,30 +554,29 @@ class DataSourceManager:
             for day_data in data['forecast']['forecastday'][:days]:
                 weather.append(self._convert_weatherapi_daily(day_data))
 
-        return {
-            "data": {
-                "request": [{
-                    "type": "feature",
-                    "query": f"{location.get('lat', 0)},{location.get('lon', 0)}"
-                }],
-                "current_condition": [current_condition],
-                "weather": weather
-            }
-        }
+        return self._envelope(location.get('lat', 0), location.get('lon', 0), current_condition, weather)
 
     def _convert_weatherapi_hourly(self, hour_data: Dict) -> Dict:
         """Convert WeatherAPI hourly data to wttr.in format."""
         temp_c = hour_data.get('temp_c', 0)
+        temp_f = hour_data.get('temp_f')
+        if temp_f is None:
+            temp_f = _c_to_f(temp_c)
 
         wind_kmph = hour_data.get('wind_kph', 0)
+        wind_mph = hour_data.get('wind_mph')
+        if wind_mph is None:
+            wind_mph = _kmph_to_mph(wind_kmph)
+
+        condition = hour_data.get('condition', {})
 
         return {
-            "temp_C": str(int(round(temp_c, 0))),
-            "temp_F": str(int(round(hour_data.get('temp_f', temp_c * 9/5 + 32), 0))),
-            "weatherCode": str(hour_data.get('condition', {}).get('code', 1000)),
-            "weatherDesc": [{"value": hour_data.get('condition', {}).get('text', 'Clear')}],
-            "windspeedKmph": str(int(round(wind_kmph, 0))),
-            "windspeedMiles": str(int(round(hour_data.get('wind_mph', wind_kmph * 0.621371), 0))),
+            "temp_C": str(round(temp_c)),
+            "temp_F": str(round(temp_f)),
+            "weatherCode": str(condition.get('code', 1000)),
+            "weatherDesc": [{"value": condition.get('text', 'Clear')}],
+            "windspeedKmph": str(round(wind_kmph)),
+            "windspeedMiles": str(round(wind_mph)),
             "winddirDegree": str(hour_data.get('wind_degree', 0)),
             "winddir16Point": hour_data.get('wind_dir', 'N'),
             "precipMM": str(hour_data.get('precip_mm', 0)),
@@ -426,7 +584,7 @@ class DataSourceManager:
             "pressure": str(hour_data.get('pressure_mb', 0)),
             "visibility": str(hour_data.get('vis_km', 0) * 1000),  # Convert km to meters
             "cloudcover": str(hour_data.get('cloud', 0)),
-            "FeelsLikeC": str(int(round(hour_data.get('feelslike_c', temp_c), 0))),
+            "FeelsLikeC": str(round(hour_data.get('feelslike_c', temp_c))),
             "uvIndex": str(int(hour_data.get('uv', 0))),
         }
 
@@ -436,12 +594,12 @@ class DataSourceManager:
 
         return {
             "date": day_data.get('date', ''),
-            "maxtempC": str(int(round(day.get('maxtemp_c', 0), 0))),
-            "maxtempF": str(int(round(day.get('maxtemp_f', 0), 0))),
-            "mintempC": str(int(round(day.get('mintemp_c', 0), 0))),
-            "mintempF": str(int(round(day.get('mintemp_f', 0), 0))),
-            "avgtempC": str(int(round(day.get('avgtemp_c', 0), 0))),
-            "avgtempF": str(int(round(day.get('avgtemp_f', 0), 0))),
+            "maxtempC": str(round(day.get('maxtemp_c', 0))),
+            "maxtempF": str(round(day.get('maxtemp_f', 0))),
+            "mintempC": str(round(day.get('mintemp_c', 0))),
+            "mintempF": str(round(day.get('mintemp_f', 0))),
+            "avgtempC": str(round(day.get('avgtemp_c', 0))),
+            "avgtempF": str(round(day.get('avgtemp_f', 0))),
             "totalSnow_cm": str(day.get('totalsnow_cm', 0)),
             "sunHour": "12",  # Not provided, default
             "uvIndex": str(int(day.get('uv', 0))),
@@ -464,57 +622,51 @@ class DataSourceManager:
             weather.append(self._convert_accuweather_daily(day_data))
 
         # Use first day for current condition approximation
-        current_condition = self._convert_accuweather_daily(data[0])
-        # Remove daily-specific fields for current
-        current_condition.pop('date', None)
-        current_condition.pop('maxtempC', None)
-        current_condition.pop('maxtempF', None)
-        current_condition.pop('mintempC', None)
-        current_condition.pop('mintempF', None)
-        current_condition.pop('avgtempC', None)
-        current_condition.pop('avgtempF', None)
+        avg_temp = self._accuweather_temperatures(data[0])[2]
+        current_condition = self._convert_accuweather_current(data[0], avg_temp)
 
-        return {
-            "data": {
-                "request": [{
-                    "type": "feature",
-                    "query": f"{location_lat},{location_lon}"
-                }],
-                "current_condition": [current_condition],
-                "weather": weather
-            }
-        }
+        return self._envelope(location_lat, location_lon, current_condition, weather)
+
+    def _accuweather_temperatures(self, day_data: Dict) -> tuple:
+        """Return (max, min, avg) temperature of an AccuWeather daily forecast."""
+        temp = day_data.get('Temperature', {})
+        max_temp = temp.get('Maximum', {}).get('Value', 0)
+        min_temp = temp.get('Minimum', {}).get('Value', 0)
+        return max_temp, min_temp, (max_temp + min_temp) / 2
 
     def _convert_accuweather_daily(self, day_data: Dict) -> Dict:
         """Convert AccuWeather daily data to wttr.in format."""
-        temp = day_data.get('Temperature', {})
+        max_temp, min_temp, avg_temp = self._accuweather_temperatures(day_data)
+
+        daily = {
+            "date": day_data.get('Date', ''),
+            "maxtempC": str(round(max_temp)),
+            "maxtempF": str(_c_to_f(max_temp)),
+            "mintempC": str(round(min_temp)),
+            "mintempF": str(_c_to_f(min_temp)),
+            "avgtempC": str(round(avg_temp)),
+            "avgtempF": str(_c_to_f(avg_temp)),
+        }
+        # Additional current weather fields
+        daily.update(self._convert_accuweather_current(day_data, avg_temp))
+        return daily
+
+    def _convert_accuweather_current(self, day_data: Dict, avg_temp: float) -> Dict:
+        """Convert AccuWeather daily data to wttr.in current condition fields."""
         real_feel = day_data.get('RealFeelTemperature', {})
         wind = day_data.get('Wind', {}).get('Speed', {})
 
-        # Get max/min temps
-        max_temp = temp.get('Maximum', {}).get('Value', 0)
-        min_temp = temp.get('Minimum', {}).get('Value', 0)
-        avg_temp = (max_temp + min_temp) / 2
-
         return {
-            "date": day_data.get('Date', ''),
-            "maxtempC": str(int(round(max_temp, 0))),
-            "maxtempF": str(int(round(max_temp * 9/5 + 32, 0))),
-            "mintempC": str(int(round(min_temp, 0))),
-            "mintempF": str(int(round(min_temp * 9/5 + 32, 0))),
-            "avgtempC": str(int(round(avg_temp, 0))),
-            "avgtempF": str(int(round(avg_temp * 9/5 + 32, 0))),
             "totalSnow_cm": "0",  # Not provided by AccuWeather in this endpoint
             "sunHour": str(day_data.get('HoursOfSun', 12)),
             "uvIndex": str(day_data.get('UVIndex', 0)),
             "hourly": [],  # AccuWeather doesn't provide hourly in daily endpoint
-            # Additional current weather fields
-            "temp_C": str(int(round(avg_temp, 0))),
-            "temp_F": str(int(round(avg_temp * 9/5 + 32, 0))),
+            "temp_C": str(round(avg_temp)),
+            "temp_F": str(_c_to_f(avg_temp)),
             "weatherCode": "113",  # Default clear, would need mapping
             "weatherDesc": [{"value": day_data.get('IconPhrase', 'Clear')}],
-            "windspeedKmph": str(int(round(wind.get('Value', 0) * 1.60934, 0))),  # Convert mph to kmh
-            "windspeedMiles": str(int(round(wind.get('Value', 0), 0))),
+            "windspeedKmph": str(round(wind.get('Value', 0) * 1.60934)),  # Convert mph to kmh
+            "windspeedMiles": str(round(wind.get('Value', 0))),
             "winddirDegree": str(day_data.get('Wind', {}).get('Direction', {}).get('Degrees', 0)),
             "winddir16Point": "N",  # Would need conversion
             "precipMM": "0",  # Not provided in daily summary
@@ -522,7 +674,7 @@ class DataSourceManager:
             "pressure": "1013",  # Not provided
             "visibility": "10000",  # Not provided
             "cloudcover": "0",  # Not provided
-            "FeelsLikeC": str(int(round(real_feel.get('Maximum', {}).get('Value', avg_temp), 0))),
+            "FeelsLikeC": str(round(real_feel.get('Maximum', {}).get('Value', avg_temp))),
         }
 
 # Global instance